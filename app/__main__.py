@@ -1,8 +1,13 @@
 import uvicorn
 from app.settings import SETTINGS
+from app.serving import serve
 
 
 def main():
+    if SETTINGS.API_WORKERS > 1 and not SETTINGS.IS_DEBUG:
+        serve(SETTINGS.API_WORKERS)
+        return
+
     uvicorn.run(
         app="app.api.server:app",
         host=SETTINGS.API_HOST,
@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Чем меньше число, тем выше приоритет
+PRIORITIES = {"interactive": 0, "bulk": 1}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Ограничение числа одновременно выполняемых тяжёлых запросов.
+    Лишние запросы ждут в очереди по приоритету, а при переполнении очереди
+    или истечении времени ожидания отклоняются с Retry-After.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue: int,
+        queue_timeouts: dict[str, float],
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeouts = queue_timeouts
+
+        self.in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+        # Средняя длительность запроса (EMA) для оценки Retry-After
+        self._service_time = 1.0
+        self._queue_delays: deque[float] = deque(maxlen=1000)
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(not future.done() for _, _, future in self._waiters)
+
+    def retry_after(self) -> int:
+        rounds = (self.queued + 1) / max(self.max_in_flight, 1)
+        return max(1, math.ceil(rounds * self._service_time))
+
+    def _reject(self, status_code: int, reason: str) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(status_code, self.retry_after(), reason)
+
+    def _evict_lowest(self, priority: int) -> bool:
+        """Освобождает место в очереди за счёт ожидающего с более низким приоритетом"""
+        pending = [entry for entry in self._waiters if not entry[2].done()]
+        if not pending:
+            return False
+
+        lowest = max(pending)
+        if lowest[0] <= priority:
+            return False
+
+        lowest[2].set_exception(self._reject(429, "Вытеснен более приоритетным запросом"))
+        return True
+
+    async def acquire(self, priority_class: str) -> float:
+        """Ожидание слота, возвращает время в очереди в секундах"""
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            self.admitted += 1
+            self._queue_delays.append(0.0)
+            return 0.0
+
+        priority = PRIORITIES[priority_class]
+        if self.queued >= self.max_queue and not self._evict_lowest(priority):
+            raise self._reject(429, "Очередь переполнена")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.queue_timeouts[priority_class]):
+                await future
+        except TimeoutError:
+            # Слот мог освободиться одновременно с истечением таймаута
+            if not future.done() or future.cancelled():
+                future.cancel()
+                self.timed_out += 1
+                raise self._reject(503, "Превышено время ожидания в очереди")
+            if future.exception():
+                raise future.exception()
+        except BaseException:
+            if future.done() and not future.cancelled() and not future.exception():
+                self.release()
+            future.cancel()
+            raise
+
+        delay = time.perf_counter() - started
+        self.admitted += 1
+        self._queue_delays.append(delay)
+        return delay
+
+    def release(self, service_time: Optional[float] = None) -> None:
+        if service_time is not None:
+            self._service_time = 0.9 * self._service_time + 0.1 * service_time
+
+        # Слот передаётся следующему ожидающему без уменьшения in_flight
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        delays = sorted(self._queue_delays)
+
+        def percentile(p: float) -> float:
+            if not delays:
+                return 0.0
+            return delays[min(len(delays) - 1, int(p * len(delays)))] * 1000
+
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "queue_delay_ms": {
+                "p50": percentile(0.5),
+                "p99": percentile(0.99),
+                "max": delays[-1] * 1000 if delays else 0.0,
+            },
+        }
+
+
+def request_priority(
+    scope: Scope, bulk_api_keys: set[str], default: str = "interactive"
+) -> str:
+    """Класс приоритета по API ключу из списка bulk или заголовку X-Priority"""
+    headers = dict(scope["headers"])
+
+    api_key = headers.get(b"x-api-key", b"").decode("latin-1")
+    if api_key and api_key in bulk_api_keys:
+        return "bulk"
+
+    priority = headers.get(b"x-priority", b"").decode("latin-1").lower()
+    return priority if priority in PRIORITIES else default
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware для тяжёлых HTTP эндпоинтов. Контроллер берётся из
+    app.state.admission_controller, который создаётся в lifespan.
+    Websocket соединения пропускаются: потоковый эндпоинт занимает слот
+    на время обработки каждого кадра, а не всего соединения.
+    Приоритет задаётся заголовком X-Priority или API ключом из списка bulk.
+    """
+
+    def __init__(self, app: ASGIApp, paths: tuple[str, ...]):
+        self.app = app
+        self.paths = paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            return await self.app(scope, receive, send)
+
+        state = scope["app"].state
+        controller: Optional[AdmissionController] = getattr(
+            state, "admission_controller", None
+        )
+        if controller is None:
+            return await self.app(scope, receive, send)
+
+        priority = request_priority(scope, getattr(state, "bulk_api_keys", set()))
+        try:
+            await controller.acquire(priority)
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"message": e.reason},
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            return await response(scope, receive, send)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(time.perf_counter() - started)
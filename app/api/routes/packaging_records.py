@@ -1,23 +1,32 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
 from app.api.schemas.packaging import (
     PackagingRecordCreate,
     PackagingRecordRead,
     PackagingRecordUpdate,
+    packaging_row_adapter,
+    packaging_rows_adapter,
 )
-from app.api.schemas.response import ListResponse, MetaModel
+from app.api.schemas.response import ListResponse, MetaModel, adapter_response
 from app.models.packaging_record import PackagingRecord
 from app.services.database import get_async_session, AsyncSession
 from app.settings import SETTINGS
 
 router = APIRouter(prefix="/packagings", tags=["Packagings"])
 
+# Записи из БД сериализуются напрямую из сырых данных, без моделей и повторной
+# валидации FastAPI: response_model нужен только для документации
 
-@router.post("/")
+
+def record_response(record: PackagingRecord | None) -> Response:
+    return adapter_response(packaging_row_adapter, record and record.to_dict())
+
+
+@router.post("/", response_model=PackagingRecordRead)
 async def add_packaging(
     data: PackagingRecordCreate,
     session: AsyncSession = Depends(get_async_session),
-) -> PackagingRecordRead:
+) -> Response:
     record = PackagingRecord(
         code=data.code,
         source=data.source,
@@ -28,32 +37,32 @@ async def add_packaging(
     await session.commit()
     await session.refresh(record)
 
-    return record
+    return record_response(record)
 
 
-@router.get("/{code}")
+@router.get("/{code}", response_model=PackagingRecordRead | None)
 async def get_packaging(
     code: str,
     session: AsyncSession = Depends(get_async_session),
-) -> PackagingRecordRead | None:
-    return await PackagingRecord.get(code, session)
+) -> Response:
+    return record_response(await PackagingRecord.get(code, session))
 
 
-@router.put("/")
+@router.put("/", response_model=PackagingRecordRead | None)
 async def update_packaging(
     data: PackagingRecordUpdate,
     session: AsyncSession = Depends(get_async_session),
-) -> PackagingRecordRead | None:
+) -> Response:
     record = await PackagingRecord.update(**data.model_dump(), session=session)
-    return record
+    return record_response(record)
 
 
-@router.get("/")
+@router.get("/", response_model=ListResponse[PackagingRecordRead])
 async def get_packagings(
     page: int = 1,
     limit: int = 10,
     session: AsyncSession = Depends(get_async_session),
-) -> ListResponse[PackagingRecordRead]:
+) -> Response:
     offset = (page - 1) * limit
 
     packagings: list[PackagingRecord] = await PackagingRecord.get_many(
@@ -62,18 +71,14 @@ async def get_packagings(
 
     total = await PackagingRecord.count(session)
 
-    result: list = []
-    for packaging in packagings:
-        result.append(
-            PackagingRecordRead(
-                code=packaging.code,
-                source=packaging.source,
-                updated_at=packaging.updated_at,
-                items=packaging.get_items(),
-            )
-        )
-
-    return ListResponse[PackagingRecordRead](
-        data=result,
-        meta=MetaModel(offset=offset, limit=limit, returned=len(result), total=total),
+    result = [packaging.to_dict() for packaging in packagings]
+
+    return adapter_response(
+        packaging_rows_adapter,
+        {
+            "data": result,
+            "meta": MetaModel.model_construct(
+                offset=offset, limit=limit, returned=len(result), total=total
+            ),
+        },
     )
@@ -1,17 +1,32 @@
 import io
+import time
 import uuid
 import asyncio
 from pathlib import Path
+from typing import Optional
 
-from fastapi import status, HTTPException, APIRouter, File, UploadFile, Depends
+from fastapi import (
+    status,
+    HTTPException,
+    APIRouter,
+    File,
+    UploadFile,
+    Depends,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from loguru import logger
 from PIL import Image
 
-from app.services.llm_garbage_classifier import garbage_classifier
-from app.services.s3_client import s3_client
+from app.services.container import get_services
 from app.services.database import get_async_session, AsyncSession
-from app.services.qr_code import scan_codes, scan_codes_image_bytes
-from app.models.packaging_record import PackagingRecord
-from app.schemas.gatbage import GarbageData, GarbageDataList
+from app.services.image_hash import dhash, hamming_distance
+from app.services.llm_utils import IMAGE_POLICIES, get_image_policy
+from app.services.recognizer import recognize_image
+from app.api.admission import AdmissionController, AdmissionRejected, request_priority
+from app.api.schemas.response import ModelResponse
+from app.schemas.gatbage import GarbageDataList
 from app.settings import SETTINGS
 
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
@@ -19,52 +34,166 @@ MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 router = APIRouter(prefix="/recognize", tags=["Recognize"])
 
 
-@router.post("/")
-async def recognize(
-    file: UploadFile = File(..., description="Изображение для распознавания"),
-    session: AsyncSession = Depends(get_async_session),
-) -> GarbageDataList:
-    contents = io.BytesIO(await file.read())
-
-    # Проверка на размер
-    if len(contents.getvalue()) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Файл слишком большой. Максимальный размер: {MAX_FILE_SIZE / 1024 / 1024}MB",
-        )
+def check_image(image_data: bytes) -> Optional[str]:
+    """Проверка размера и корректности фото, возвращает текст ошибки"""
+    if len(image_data) > MAX_FILE_SIZE:
+        return f"Файл слишком большой. Максимальный размер: {MAX_FILE_SIZE / 1024 / 1024}MB"
 
-    # Проверка на корректность фото
     try:
-        image = Image.open(contents)
+        image = Image.open(io.BytesIO(image_data))
         image.verify()
     except Exception as img_error:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Некорректный файл изображения: {str(img_error)}",
-        )
+        return f"Некорректный файл изображения: {str(img_error)}"
+
+    return None
+
+
+@router.post("/", response_model=GarbageDataList)
+async def recognize(
+    file: UploadFile = File(..., description="Изображение для распознавания"),
+    image_policy: Optional[str] = Query(
+        None,
+        description=f"Политика подготовки изображения для LLM: {', '.join(IMAGE_POLICIES)}",
+    ),
+    session: AsyncSession = Depends(get_async_session),
+) -> ModelResponse:
+    try:
+        policy = get_image_policy(image_policy) if image_policy else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    image_data = contents.getvalue()
+    image_data = await file.read()
+
+    # Проверка на размер и корректность фото
+    if error := check_image(image_data):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
 
     # Сохранение фото в S3
     ext = Path(file.filename).suffix
     asyncio.create_task(
-        s3_client.upload_bytes(
+        get_services().s3_client.upload_bytes(
             data=image_data,
             bucket_name=SETTINGS.S3_BUCKET_NAME,
             object_name=f"{uuid.uuid4().hex}{ext}",
         )
     )
 
-    qr_codes = scan_codes_image_bytes(image_data)
-    packaging_records: list[list[GarbageData]] = []
-    for code in qr_codes:
-        record = await PackagingRecord.get(code=code.data, session=session)
-        if record and record.items:
-            packaging_records.append(record.get_items())
+    result = await recognize_image(image_data, session, image_policy=policy)
+    return ModelResponse(result)
+
+
+class FrameStream:
+    """
+    Сессия потокового распознавания: кадры-дубликаты пропускаются,
+    а при превышении числа кадров в обработке новые кадры отбрасываются.
+    Каждый кадр проходит admission control, по умолчанию с приоритетом bulk.
+    """
+
+    def __init__(self, websocket: WebSocket, image_policy):
+        self.websocket = websocket
+        self.image_policy = image_policy
+
+        state = websocket.app.state
+        self.admission_controller: Optional[AdmissionController] = getattr(
+            state, "admission_controller", None
+        )
+        self.priority = request_priority(
+            websocket.scope, getattr(state, "bulk_api_keys", set()), default="bulk"
+        )
+
+        self.last_hash: Optional[int] = None
+        self.pending: set[asyncio.Task] = set()
+        self.send_lock = asyncio.Lock()
+
+    async def send(self, frame: int, frame_status: str, **payload) -> None:
+        async with self.send_lock:
+            await self.websocket.send_json(
+                {"frame": frame, "status": frame_status, **payload}
+            )
+
+    async def submit(self, frame: int, image_data: bytes) -> None:
+        if error := check_image(image_data):
+            return await self.send(frame, "error", message=error)
+
+        frame_hash = await asyncio.to_thread(dhash, image_data)
+        if (
+            self.last_hash is not None
+            and hamming_distance(frame_hash, self.last_hash)
+            <= SETTINGS.STREAM_DUPLICATE_DISTANCE
+        ):
+            return await self.send(frame, "duplicate")
+
+        if len(self.pending) >= SETTINGS.STREAM_MAX_PENDING_FRAMES:
+            return await self.send(frame, "dropped")
+
+        self.last_hash = frame_hash
+        task = asyncio.create_task(self.process(frame, image_data))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def process(self, frame: int, image_data: bytes) -> None:
+        controller = self.admission_controller
+        if controller is not None:
+            try:
+                await controller.acquire(self.priority)
+            except AdmissionRejected as e:
+                return await self.send(frame, "busy", retry_after=e.retry_after)
+
+        started = time.perf_counter()
+        try:
+            async with get_services().session_maker() as session:
+                result = await recognize_image(
+                    image_data, session, image_policy=self.image_policy
+                )
+        except Exception as e:
+            logger.error(f"[STREAM]: frame {frame} failed: {e}")
+            return await self.send(frame, "error", message=str(e))
+        finally:
+            if controller is not None:
+                controller.release(time.perf_counter() - started)
+
+        await self.send(frame, "ok", result=result.model_dump(mode="json"))
+
+    def close(self) -> None:
+        for task in self.pending:
+            task.cancel()
+
+
+@router.websocket("/stream")
+async def recognize_stream(websocket: WebSocket, image_policy: Optional[str] = None):
+    """
+    Потоковое распознавание: клиент шлёт кадры бинарными сообщениями,
+    сервер асинхронно отвечает JSON {"frame", "status", "result"} по мере готовности.
+    status: ok / duplicate / dropped / busy (с retry_after) / error.
+    Текстовое сообщение закрывает соединение с кодом 1003.
+    """
+    try:
+        policy = get_image_policy(image_policy) if image_policy else None
+    except ValueError as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
+        return
+
+    await websocket.accept()
+    stream = FrameStream(websocket, policy)
+
+    frame = 0
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
 
-    if not packaging_records:
-        # Обработка фото без известных qr кодов
-        return await garbage_classifier.classify(image_data)
+            image_data = message.get("bytes")
+            if image_data is None:
+                await websocket.close(
+                    code=status.WS_1003_UNSUPPORTED_DATA,
+                    reason="Кадры передаются только бинарными сообщениями",
+                )
+                break
 
-    # Обработка фото с известными qr кодами
-    return await garbage_classifier.classify_with_advice(image_data, packaging_records)
+            await stream.submit(frame, image_data)
+            frame += 1
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stream.close()
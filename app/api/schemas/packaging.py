@@ -1,5 +1,7 @@
 from datetime import datetime
-from pydantic import BaseModel
+from typing import Optional, TypedDict
+from pydantic import BaseModel, TypeAdapter
+from app.api.schemas.response import MetaModel
 from app.schemas.gatbage import GarbageData
 
 
@@ -20,3 +22,21 @@ class PackagingRecordUpdate(BaseModel):
     code: str
     items: list[GarbageData]
     source: str
+
+
+class PackagingRecordRow(TypedDict):
+    """Сырые данные PackagingRecord, items уже проверены при записи в БД"""
+
+    code: str
+    items: list[dict[str, str]]
+    source: str
+    updated_at: datetime
+
+
+class PackagingRecordRows(TypedDict):
+    data: list[PackagingRecordRow]
+    meta: MetaModel
+
+
+packaging_row_adapter = TypeAdapter(Optional[PackagingRecordRow])
+packaging_rows_adapter = TypeAdapter(PackagingRecordRows)
@@ -1,6 +1,7 @@
-from typing import Generic, Optional, TypeVar
+from typing import Any, Generic, Optional, TypeVar
 
-from pydantic import BaseModel, Field
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field, TypeAdapter
 
 
 T = TypeVar("T", bound=BaseModel)
@@ -16,3 +17,15 @@ class MetaModel(BaseModel):
 class ListResponse(BaseModel, Generic[T]):
     data: list[T] = Field(default_factory=list)
     meta: Optional[MetaModel] = None
+
+
+class ModelResponse(JSONResponse):
+    """Сериализация pydantic модели напрямую в JSON без повторной валидации FastAPI"""
+
+    def render(self, content: Any) -> bytes:
+        return content.__pydantic_serializer__.to_json(content)
+
+
+def adapter_response(adapter: TypeAdapter, content: Any) -> Response:
+    """Сериализация сырых данных через TypeAdapter, без создания моделей"""
+    return Response(adapter.dump_json(content), media_type="application/json")
@@ -1,4 +1,5 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
@@ -6,15 +7,53 @@ from fastapi.responses import JSONResponse
 from loguru import logger
 from cashews import cache
 
+from app import serving
+from app.api.admission import AdmissionController, AdmissionMiddleware
 from app.api.routes import main_router
 from app.settings import SETTINGS
-from app.services import s3_client
+from app.services.container import close_services, get_services
+from app.services.llm_response import GarbageClassifierError
+from app.services.packaging_learner import run_packaging_learner
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     cache.setup("mem://")
 
+    app.state.admission_controller = AdmissionController(
+        max_in_flight=SETTINGS.ADMISSION_MAX_IN_FLIGHT,
+        max_queue=SETTINGS.ADMISSION_MAX_QUEUE,
+        queue_timeouts={
+            "interactive": SETTINGS.ADMISSION_INTERACTIVE_TIMEOUT_MS / 1000,
+            "bulk": SETTINGS.ADMISSION_BULK_TIMEOUT_MS / 1000,
+        },
+    )
+    bulk_api_keys = SETTINGS.ADMISSION_BULK_API_KEYS.split(",")
+    app.state.bulk_api_keys = {key.strip() for key in bulk_api_keys if key.strip()}
+
+    if SETTINGS.RECOGNITION_EVENTS:
+        get_services().event_writer.start()
+
+    if SETTINGS.RECOGNIZE_FAST_PATH_REFINE and not SETTINGS.RECOGNITION_EVENTS:
+        # Уточнение сохраняется только как событие refine, без событий оно бесполезно
+        logger.warning(
+            "[RECOGNIZE]: RECOGNIZE_FAST_PATH_REFINE requires RECOGNITION_EVENTS, "
+            "refinement is disabled"
+        )
+
+    learner = None
+    if SETTINGS.PACKAGING_LEARNING and not SETTINGS.RECOGNITION_EVENTS:
+        # Обучение читает только recognition_events, без них оно ничего не найдёт
+        logger.warning(
+            "[LEARNER]: PACKAGING_LEARNING requires RECOGNITION_EVENTS, "
+            "learner is not started"
+        )
+    elif SETTINGS.PACKAGING_LEARNING:
+        learner = asyncio.create_task(
+            run_packaging_learner(get_services().engine, get_services().session_maker)
+        )
+
+    s3_client = get_services().s3_client
     if (
         s3_client.endpoint_url
         and s3_client.aws_access_key_id
@@ -27,8 +66,16 @@ async def lifespan(app: FastAPI):
     else:
         logger.info("S3 is not configured")
 
+    serving.report_startup()
+
     yield
-    ...
+
+    # Обучение использует engine, дожидаемся его остановки до закрытия сервисов
+    if learner:
+        learner.cancel()
+        with suppress(asyncio.CancelledError):
+            await learner
+    await close_services()
 
 
 app = FastAPI(
@@ -38,6 +85,8 @@ app = FastAPI(
     swagger_ui_parameters={"persistAuthorization": True},
 )
 
+# Добавляется до CORS, чтобы отклонённые запросы тоже получали CORS заголовки
+app.add_middleware(AdmissionMiddleware, paths=("/api/v1/recognize",))
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -52,6 +101,14 @@ def log_fastapi_error(exc: Exception) -> None:
     logger.error(f"[CORE]: {exc.__class__.__name__} in FastAPI: {exc}")
 
 
+@app.exception_handler(GarbageClassifierError)
+async def classifier_exception_handler(
+    request: Request, exc: GarbageClassifierError
+) -> JSONResponse:
+    log_fastapi_error(exc)
+    return JSONResponse(status_code=502, content={"message": str(exc)})
+
+
 @app.exception_handler(Exception)
 async def any_exception_handler(request: Request, exc: Exception) -> JSONResponse:
     log_fastapi_error(exc)
@@ -63,3 +120,8 @@ async def any_exception_handler(request: Request, exc: Exception) -> JSONRespons
 @app.get("/")
 async def hello_world():
     return {"message": "Hello World"}
+
+
+@app.get("/metrics/admission")
+async def admission_metrics(request: Request):
+    return request.app.state.admission_controller.stats()
@@ -30,6 +30,15 @@ class PackagingRecord(Base):
     def get_items(self) -> List[GarbageData]:
         return [GarbageData(**item) for item in self.items]
 
+    def to_dict(self) -> dict:
+        """Сырые данные для ответа, items проверены при записи"""
+        return {
+            "code": self.code,
+            "items": self.items,
+            "source": self.source,
+            "updated_at": self.updated_at,
+        }
+
     def set_items(self, items: List[GarbageData]):
         self.items = []
         for item in items:
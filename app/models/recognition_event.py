@@ -0,0 +1,31 @@
+from datetime import datetime
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import BigInteger, Float, String, JSON, DateTime
+
+from .packaging_record import Base
+
+
+class RecognitionEvent(Base):
+    __tablename__ = "recognition_events"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+
+    # sha256 исходного изображения
+    image_hash: Mapped[str] = mapped_column(String(64), index=True)
+
+    # JSONB: list[str], коды, найденные на фото
+    codes: Mapped[list] = mapped_column(JSON, nullable=False)
+
+    # JSONB: list[GarbageData]
+    items: Mapped[list] = mapped_column(JSON, nullable=False)
+
+    # classify / advice / fast_path / refine
+    mode: Mapped[str] = mapped_column(String)
+
+    model: Mapped[str] = mapped_column(String)
+
+    latency_ms: Mapped[float] = mapped_column(Float)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, index=True
+    )
@@ -1 +0,0 @@
-from .s3_client import s3_client
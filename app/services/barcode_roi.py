@@ -0,0 +1,145 @@
+import io
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+# Сторона уменьшенного изображения, на котором ищутся кандидаты
+ANALYSIS_SIZE = 320
+# Размер ячейки сетки в пикселях уменьшенного изображения
+CELL_SIZE = 16
+# Порог градиента, начиная с которого пиксель считается краем
+EDGE_THRESHOLD = 40
+# Доля краевых пикселей в ячейке для штрихкода и для 2D кода (QR, DataMatrix)
+BARCODE_DENSITY = 0.2
+MATRIX_DENSITY = 0.35
+# Насколько градиент должен быть направленным для штрихкода
+BARCODE_ANISOTROPY = 0.4
+# Минимальное число ячеек в регионе
+MIN_REGION_CELLS = 2
+MAX_REGIONS = 3
+# Белый отступ между областями в мозаике, не меньше тихой зоны кодов
+MOSAIC_GAP = 32
+
+Box = tuple[int, int, int, int]
+
+
+def _candidate_cells(gray: np.ndarray) -> np.ndarray:
+    gx = np.abs(np.diff(gray, axis=1))[:-1, :]
+    gy = np.abs(np.diff(gray, axis=0))[:, :-1]
+
+    rows, cols = gx.shape[0] // CELL_SIZE, gx.shape[1] // CELL_SIZE
+    gx = gx[: rows * CELL_SIZE, : cols * CELL_SIZE]
+    gy = gy[: rows * CELL_SIZE, : cols * CELL_SIZE]
+
+    def per_cell(values: np.ndarray) -> np.ndarray:
+        return values.reshape(rows, CELL_SIZE, cols, CELL_SIZE).mean(axis=(1, 3))
+
+    density = per_cell((np.maximum(gx, gy) > EDGE_THRESHOLD).astype(np.float32))
+    mean_gx, mean_gy = per_cell(gx), per_cell(gy)
+    anisotropy = np.abs(mean_gx - mean_gy) / (mean_gx + mean_gy + 1e-6)
+
+    barcode = (density > BARCODE_DENSITY) & (anisotropy > BARCODE_ANISOTROPY)
+    matrix = density > MATRIX_DENSITY
+    return barcode | matrix
+
+
+def _regions(cells: np.ndarray) -> list[list[tuple[int, int]]]:
+    """Связные группы ячеек-кандидатов (8-связность)"""
+    rows, cols = cells.shape
+    seen = np.zeros_like(cells)
+    regions = []
+
+    for start in zip(*np.nonzero(cells)):
+        if seen[start]:
+            continue
+
+        seen[start] = True
+        queue, region = deque([start]), []
+        while queue:
+            row, col = queue.popleft()
+            region.append((row, col))
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    r, c = row + dr, col + dc
+                    if not (0 <= r < rows and 0 <= c < cols):
+                        continue
+                    if cells[r, c] and not seen[r, c]:
+                        seen[r, c] = True
+                        queue.append((r, c))
+
+        if len(region) >= MIN_REGION_CELLS:
+            regions.append(region)
+
+    return sorted(regions, key=len, reverse=True)[:MAX_REGIONS]
+
+
+def find_code_regions(image: Image.Image) -> list[Box]:
+    """
+    Поиск областей, где вероятно есть штрихкод или QR код.
+    Возвращает прямоугольники в координатах исходного изображения,
+    пустой список означает что кодов на фото скорее всего нет.
+    """
+    width, height = image.size
+
+    # Для JPEG декодируем сразу в уменьшенном масштабе
+    image.draft("L", (ANALYSIS_SIZE, ANALYSIS_SIZE))
+    small = image.convert("L")
+    small.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE), Image.Resampling.BILINEAR)
+
+    gray = np.asarray(small, dtype=np.float32)
+    scale_x, scale_y = width / small.width, height / small.height
+
+    boxes = []
+    for region in _regions(_candidate_cells(gray)):
+        rows = [row for row, _ in region]
+        cols = [col for _, col in region]
+
+        # Отступ в одну ячейку, чтобы не обрезать тихую зону кода
+        left = max(min(cols) - 1, 0) * CELL_SIZE * scale_x
+        top = max(min(rows) - 1, 0) * CELL_SIZE * scale_y
+        right = (max(cols) + 2) * CELL_SIZE * scale_x
+        bottom = (max(rows) + 2) * CELL_SIZE * scale_y
+
+        boxes.append(
+            (int(left), int(top), min(int(right), width), min(int(bottom), height))
+        )
+
+    return boxes
+
+
+def _decodable(image: Image.Image) -> Image.Image:
+    """PNG не поддерживает CMYK и часть других режимов JPEG, ZXing нужны L или RGB"""
+    if image.mode in ("L", "RGB"):
+        return image
+    return image.convert("RGB")
+
+
+def code_regions_mosaic(image_bytes: bytes) -> bytes | None:
+    """
+    Области-кандидаты, склеенные в одно PNG изображение столбиком с белыми
+    отступами, чтобы ZXing декодировал их все за один запуск JVM.
+    None если кодов на фото скорее всего нет.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        boxes = find_code_regions(image)
+
+    if not boxes:
+        return None
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        crops = [_decodable(image.crop(box)) for box in boxes]
+
+    mode = "L" if all(crop.mode == "L" for crop in crops) else "RGB"
+    width = max(crop.width for crop in crops) + 2 * MOSAIC_GAP
+    height = sum(crop.height for crop in crops) + (len(crops) + 1) * MOSAIC_GAP
+
+    mosaic = Image.new(mode, (width, height), "white")
+    top = MOSAIC_GAP
+    for crop in crops:
+        mosaic.paste(crop.convert(mode), (MOSAIC_GAP, top))
+        top += crop.height + MOSAIC_GAP
+
+    buffer = io.BytesIO()
+    mosaic.save(buffer, format="PNG")
+    return buffer.getvalue()
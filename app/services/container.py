@@ -0,0 +1,144 @@
+import asyncio
+from collections.abc import Coroutine
+from functools import cached_property
+from typing import TYPE_CHECKING, Optional
+
+from loguru import logger
+
+from app.settings import Settings, get_settings
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+    from .event_writer import EventWriter
+    from .llm_garbage_classifier import GarbageClassifier
+    from .s3_client import AsyncS3Client
+
+
+class Services:
+    """
+    Контейнер сервисов приложения. Клиенты создаются при первом обращении,
+    поэтому импорт приложения не открывает соединений и не читает сеть,
+    а каждый воркер получает свои экземпляры.
+    Фоновые задачи, использующие сервисы, тоже принадлежат контейнеру
+    и завершаются до закрытия клиентов.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._background_tasks: set[asyncio.Task] = set()
+        self._spawned = 0
+        self._closing = False
+
+    @cached_property
+    def garbage_classifier(self) -> "GarbageClassifier":
+        from .llm_garbage_classifier import GarbageClassifier
+        from .llm_utils import get_image_policy
+
+        settings = self.settings
+        return GarbageClassifier(
+            openai_base_url=settings.OPENAI_API_BASE,
+            openai_api_key=settings.OPENAI_API_KEY.get_secret_value(),
+            openai_gpt_model=settings.OPENAI_GPT_MODEL,
+            proxy=(
+                settings.HTTP_PROXY_SERVER.get_secret_value()
+                if settings.HTTP_PROXY_SERVER
+                else None
+            ),
+            structured_output=settings.OPENAI_STRUCTURED_OUTPUT,
+            max_items=settings.OPENAI_MAX_ITEMS,
+            image_policy=get_image_policy(settings.LLM_IMAGE_POLICY),
+        )
+
+    @cached_property
+    def s3_client(self) -> "AsyncS3Client":
+        from .s3_client import AsyncS3Client
+
+        return AsyncS3Client(
+            endpoint_url=self.settings.S3_ENDPOINT,
+            aws_access_key_id=self.settings.S3_ACCESS_KEY,
+            aws_secret_access_key=self.settings.S3_SECRET_KEY,
+        )
+
+    @cached_property
+    def engine(self) -> "AsyncEngine":
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        from .database import database_url
+
+        return create_async_engine(database_url(self.settings))
+
+    @cached_property
+    def session_maker(self) -> "async_sessionmaker[AsyncSession]":
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        return async_sessionmaker(self.engine, expire_on_commit=False)
+
+    @cached_property
+    def event_writer(self) -> "EventWriter":
+        from .event_writer import EventWriter
+
+        return EventWriter(
+            self.session_maker,
+            batch_size=self.settings.RECOGNITION_EVENTS_BATCH_SIZE,
+            flush_interval=self.settings.RECOGNITION_EVENTS_FLUSH_INTERVAL_MS / 1000,
+            max_buffer=self.settings.RECOGNITION_EVENTS_MAX_BUFFER,
+        )
+
+    def adopt(self, task: asyncio.Task) -> None:
+        """Уже запущенная задача, которую нужно отменить и дождаться при закрытии"""
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def spawn(self, coro: Coroutine) -> bool:
+        """
+        Запуск необязательной фоновой работы. Одновременно выполняется не больше
+        BACKGROUND_MAX_TASKS таких задач, лишние и запущенные при закрытии
+        отбрасываются, возвращается False.
+        """
+        if self._closing or self._spawned >= self.settings.BACKGROUND_MAX_TASKS:
+            coro.close()
+            logger.warning("[SERVICES]: background task limit reached, task dropped")
+            return False
+
+        def finished(task: asyncio.Task) -> None:
+            self._spawned -= 1
+
+        task = asyncio.create_task(coro)
+        self._spawned += 1
+        task.add_done_callback(finished)
+        self.adopt(task)
+        return True
+
+    async def aclose(self) -> None:
+        # Фоновые задачи используют классификатор, БД и запись событий
+        self._closing = True
+        tasks = list(self._background_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Закрываем только то, что успели создать, события пишем до закрытия БД
+        if "event_writer" in self.__dict__:
+            await self.event_writer.stop()
+        if "garbage_classifier" in self.__dict__:
+            await self.garbage_classifier.openai_client.close()
+        if "engine" in self.__dict__:
+            await self.engine.dispose()
+
+
+_services: Optional[Services] = None
+
+
+def get_services() -> Services:
+    global _services
+    if _services is None:
+        _services = Services(get_settings())
+    return _services
+
+
+async def close_services() -> None:
+    global _services
+    if _services is not None:
+        await _services.aclose()
+        _services = None
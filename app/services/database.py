@@ -1,16 +1,15 @@
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from app.settings import SETTINGS
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.settings import Settings
+from .container import get_services
 
 
-DATABASE_URL = f"postgresql+asyncpg://{SETTINGS.DB_USER.get_secret_value()}:{SETTINGS.DB_PASS.get_secret_value()}@{SETTINGS.DB_HOST}:{SETTINGS.DB_PORT}/{SETTINGS.DB_NAME.get_secret_value()}"
-
-engine = create_async_engine(DATABASE_URL)
-async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+def database_url(settings: Settings) -> str:
+    return f"postgresql+asyncpg://{settings.DB_USER.get_secret_value()}:{settings.DB_PASS.get_secret_value()}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME.get_secret_value()}"
 
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session_maker() as session:
+    async with get_services().session_maker() as session:
         try:
             yield session
         except Exception:
@@ -0,0 +1,124 @@
+import asyncio
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.recognition_event import RecognitionEvent
+
+# Предел паузы между попытками записи, пока БД недоступна
+MAX_RETRY_INTERVAL = 30.0
+
+
+class EventWriter:
+    """
+    Отложенная запись RecognitionEvent: события копятся в памяти и пишутся
+    пачками одним multi-row INSERT по размеру пачки или по таймеру.
+    При переполнении буфера отбрасываются самые старые события, пачка,
+    которую не удалось записать, возвращается в начало буфера.
+    Все потерянные события учитываются в dropped. Пока БД недоступна,
+    пауза между попытками удваивается от flush_interval до MAX_RETRY_INTERVAL.
+    """
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_buffer: int = 10000,
+    ):
+        self.session_maker = session_maker
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._buffer: deque[dict] = deque(maxlen=max_buffer)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Число неудачных попыток записи подряд, 0 когда БД доступна
+        self._failures = 0
+        self.dropped = 0
+
+    def add(self, **event) -> None:
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+
+        event.setdefault("created_at", datetime.utcnow())
+        self._buffer.append(event)
+
+        # Во время сбоя пишем только по таймеру, чтобы не долбить БД на каждый запрос
+        if len(self._buffer) >= self.batch_size and not self._failures:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        while self._buffer:
+            batch = [
+                self._buffer.popleft()
+                for _ in range(min(self.batch_size, len(self._buffer)))
+            ]
+
+            try:
+                async with self.session_maker() as session:
+                    await session.execute(insert(RecognitionEvent), batch)
+                    await session.commit()
+            except Exception as e:
+                # Аналитика не должна влиять на распознавание: повторим на следующем
+                # тике, а не поместившиеся в буфер старые события отбрасываем
+                room = self._buffer.maxlen - len(self._buffer)
+                lost = max(len(batch) - room, 0)
+                self.dropped += lost
+                self._buffer.extendleft(reversed(batch[lost:]))
+
+                # Одна запись в лог на сбой, а не на каждую попытку
+                if not self._failures:
+                    logger.error(f"[EVENTS]: database unavailable, buffering events: {e}")
+                self._failures += 1
+                return
+
+            if self._failures:
+                logger.info(
+                    f"[EVENTS]: database available again after {self._failures} "
+                    f"failed attempts, {self.dropped} events dropped so far"
+                )
+                self._failures = 0
+
+    def _next_flush_in(self) -> float:
+        if not self._failures:
+            return self.flush_interval
+        delay = self.flush_interval * 2 ** (self._failures - 1)
+        return min(delay, max(MAX_RETRY_INTERVAL, self.flush_interval))
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._next_flush_in())
+            except TimeoutError:
+                pass
+
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Даём текущей записи завершиться, а не отменяем её посреди пачки
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+        await self.flush()
+
+        # БД недоступна и при остановке: оставшиеся события теряются
+        self.dropped += len(self._buffer)
+        self._buffer.clear()
+
+        if self.dropped:
+            logger.warning(f"[EVENTS]: {self.dropped} events dropped")
@@ -0,0 +1,24 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8
+
+
+def dhash(image_bytes: bytes) -> int:
+    """Difference hash: 64 бита, близкие кадры отличаются в нескольких битах"""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        # Для JPEG декодируем сразу в минимальном масштабе
+        image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+        small = image.convert("L").resize(
+            (HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR
+        )
+
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
@@ -3,7 +3,9 @@ from typing import Optional
 
 from httpx import AsyncClient
 from httpx._types import ProxyTypes
+from loguru import logger
 from openai import AsyncOpenAI
+from pydantic import BaseModel
 
 from app.schemas.gatbage import (
     GarbageType,
@@ -12,8 +14,30 @@ from app.schemas.gatbage import (
     GarbageData,
     GarbageDataList,
 )
-from .llm_utils import optimize_for_openai
-from app.settings import SETTINGS
+from .llm_utils import ImagePolicy, optimize_for_openai
+from .llm_response import (
+    GarbageClassifierError,
+    compact_codes_prompt,
+    compact_max_tokens,
+    compact_response_format,
+    decode_compact,
+    decode_full,
+)
+
+# Во сколько раз увеличивается лимит, если ответ упёрся в max_tokens
+LENGTH_RETRY_FACTOR = 4
+
+REPAIR_PROMPT = """
+Предыдущий ответ не прошёл проверку: {error}
+Исправь его и верни только корректный JSON в требуемой структуре, без пояснений.
+""".strip()
+
+
+class TokenUsage(BaseModel):
+    """Суммарные токены всех запросов одной классификации, включая повторы"""
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
 
 
 class GarbageClassifier:
@@ -23,6 +47,9 @@ class GarbageClassifier:
         openai_api_key: str,
         openai_gpt_model: str,
         proxy: Optional[ProxyTypes] = None,
+        structured_output: bool = False,
+        max_items: int = 8,
+        image_policy: Optional[ImagePolicy] = None,
     ):
         self.openai_gpt_model = openai_gpt_model
         self.openai_client = AsyncOpenAI(
@@ -31,6 +58,17 @@ class GarbageClassifier:
             http_client=AsyncClient(proxy=proxy),
         )
 
+        self.image_policy = image_policy or ImagePolicy()
+        self.structured_output = structured_output
+        if structured_output:
+            self.response_format = compact_response_format()
+            self.max_tokens = compact_max_tokens(max_items)
+            self.decode = decode_compact
+        else:
+            self.response_format = {"type": "json_object"}
+            self.max_tokens = 1024
+            self.decode = decode_full
+
     @staticmethod
     def merge_garbage_items(items: list[GarbageData]) -> list[GarbageData]:
         unique = {}
@@ -43,8 +81,117 @@ class GarbageClassifier:
 
         return list(unique.values())
 
+    async def _complete(
+        self,
+        system_prompt: str,
+        image: bytes,
+        image_policy: Optional[ImagePolicy] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> GarbageDataList:
+        if self.structured_output:
+            system_prompt = f"{system_prompt}\n\n{compact_codes_prompt()}"
+
+        image_policy = image_policy or self.image_policy
+        optimized_image, _ = optimize_for_openai(image, image_policy)
+        base64_image = base64.b64encode(optimized_image).decode("utf-8")
+
+        image_url = {"url": f"data:{image_policy.mime_type};base64,{base64_image}"}
+        if image_policy.detail != "auto":
+            image_url["detail"] = image_policy.detail
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "image_url", "image_url": image_url},
+                ],
+            },
+        ]
+
+        max_tokens = self.max_tokens
+        response = await self._create(messages, max_tokens, usage)
+
+        # Обрезанный по лимиту ответ исправлением не починить, повторяем с запасом
+        if response.choices[0].finish_reason == "length":
+            max_tokens *= LENGTH_RETRY_FACTOR
+            logger.warning(
+                f"[LLM]: response hit max_tokens, retrying with {max_tokens}"
+            )
+            response = await self._create(messages, max_tokens, usage)
+
+            if response.choices[0].finish_reason == "length":
+                raise GarbageClassifierError(
+                    f"LLM response exceeded {max_tokens} tokens"
+                )
+
+        content = response.choices[0].message.content or ""
+
+        try:
+            result = self.decode(content)
+        except ValueError as e:
+            logger.warning(f"[LLM]: invalid response, repairing: {e}")
+            result = await self._repair(
+                system_prompt, content, e, max_tokens, usage
+            )
+
+        result.items = self.merge_garbage_items(result.items)
+        return result
+
+    async def _create(
+        self,
+        messages: list[dict],
+        max_tokens: int,
+        usage: Optional[TokenUsage] = None,
+    ):
+        response = await self.openai_client.chat.completions.create(
+            model=self.openai_gpt_model,
+            max_tokens=max_tokens,
+            messages=messages,
+            response_format=self.response_format,
+        )
+
+        if response.usage:
+            logger.info(
+                f"[LLM]: prompt_tokens={response.usage.prompt_tokens} "
+                f"completion_tokens={response.usage.completion_tokens}"
+            )
+            if usage is not None:
+                usage.prompt_tokens += response.usage.prompt_tokens
+                usage.completion_tokens += response.usage.completion_tokens
+
+        return response
+
+    async def _repair(
+        self,
+        system_prompt: str,
+        content: str,
+        error: Exception,
+        max_tokens: int,
+        usage: Optional[TokenUsage] = None,
+    ) -> GarbageDataList:
+        # Изображение повторно не отправляем: исправление идёт только по тексту
+        response = await self._create(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "assistant", "content": content},
+                {"role": "user", "content": REPAIR_PROMPT.format(error=error)},
+            ],
+            max_tokens,
+            usage,
+        )
+        content = response.choices[0].message.content or ""
+
+        try:
+            return self.decode(content)
+        except ValueError as e:
+            raise GarbageClassifierError(f"Invalid LLM response: {e}") from e
+
     async def classify_with_advice(
-        self, image: bytes, packaging_records: list[list[GarbageData]]
+        self,
+        image: bytes,
+        packaging_records: list[list[GarbageData]],
+        image_policy: Optional[ImagePolicy] = None,
     ):
         qr_info = [[gd.model_dump() for gd in group] for group in packaging_records]
 
@@ -97,40 +244,14 @@ unknown — невозможно определить состояние: низ
 """.strip()
         )
 
-        optimized_image = optimize_for_openai(image, 300)
-        base64_image = base64.b64encode(optimized_image).decode("utf-8")
-
-        response = await self.openai_client.chat.completions.create(
-            model=self.openai_gpt_model,
-            max_tokens=1024,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            },
-                        }
-                    ],
-                },
-            ],
-            response_format={"type": "json_object"},
-        )
-
-        content = response.choices[0].message.content
-        if content is None:
-            raise Exception
+        return await self._complete(system_prompt, image, image_policy)
 
-        content = content.removeprefix("```json\n").removesuffix("\n```")
-        result = GarbageDataList.model_validate_json(content)
-
-        result.items = self.merge_garbage_items(result.items)
-        return result
-
-    async def classify(self, image: bytes):
+    async def classify(
+        self,
+        image: bytes,
+        image_policy: Optional[ImagePolicy] = None,
+        usage: Optional[TokenUsage] = None,
+    ):
         system_prompt = (
             f"""
 Ты система классификации отходов.
@@ -167,47 +288,4 @@ unknown — невозможно определить состояние: низ
 """.strip()
         )
 
-        optimized_image = optimize_for_openai(image, 300)
-        base64_image = base64.b64encode(optimized_image).decode("utf-8")
-
-        response = await self.openai_client.chat.completions.create(
-            model=self.openai_gpt_model,
-            max_tokens=1024,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            },
-                        }
-                    ],
-                },
-            ],
-            response_format={"type": "json_object"},
-        )
-
-        content = response.choices[0].message.content
-        if content is None:
-            raise Exception
-
-        content = content.removeprefix("```json\n").removesuffix("\n```")
-        result = GarbageDataList.model_validate_json(content)
-
-        result.items = self.merge_garbage_items(result.items)
-        return result
-
-
-garbage_classifier = GarbageClassifier(
-    openai_base_url=SETTINGS.OPENAI_API_BASE,
-    openai_api_key=SETTINGS.OPENAI_API_KEY.get_secret_value(),
-    openai_gpt_model=SETTINGS.OPENAI_GPT_MODEL,
-    proxy=(
-        SETTINGS.HTTP_PROXY_SERVER.get_secret_value()
-        if SETTINGS.HTTP_PROXY_SERVER
-        else None
-    ),
-)
+        return await self._complete(system_prompt, image, image_policy, usage)
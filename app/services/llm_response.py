@@ -0,0 +1,149 @@
+import json
+
+from app.schemas.gatbage import (
+    GarbageType,
+    GarbageSubtype,
+    GarbageState,
+    GarbageData,
+    GarbageDataList,
+)
+
+class GarbageClassifierError(Exception):
+    """Модель вернула ответ, который не удалось разобрать даже после исправления"""
+
+
+# Короткие коды значений для structured output: модель отвечает кодами,
+# а не полными названиями, что заметно сокращает число completion токенов
+TYPE_CODES: dict[GarbageType, str] = {
+    GarbageType.Cardboard: "cb",
+    GarbageType.Glass: "gl",
+    GarbageType.Metal: "mt",
+    GarbageType.Paper: "pa",
+    GarbageType.Plastic: "pl",
+    GarbageType.Trash: "tr",
+}
+
+SUBTYPE_CODES: dict[GarbageSubtype, str] = {
+    GarbageSubtype.PET_Bottle: "pet1",
+    GarbageSubtype.PET_Bottle_white: "pet2",
+    GarbageSubtype.PET_Container: "pet3",
+    GarbageSubtype.HDPE_Container: "hd1",
+    GarbageSubtype.HDPE_Film: "hd2",
+    GarbageSubtype.HDPE_Bag: "hd3",
+    GarbageSubtype.PP_Container: "pp1",
+    GarbageSubtype.PP_Large: "pp2",
+    GarbageSubtype.PP_Bag: "pp3",
+    GarbageSubtype.FOAM_Packaging: "fm1",
+    GarbageSubtype.FOAM_Egg: "fm2",
+    GarbageSubtype.FOAM_Building: "fm3",
+    GarbageSubtype.FOAM_Food: "fm4",
+    GarbageSubtype.Unknown: "unk",
+}
+
+STATE_CODES: dict[GarbageState, str] = {
+    GarbageState.Clean: "c",
+    GarbageState.Dirty: "d",
+    GarbageState.Food_contaminated: "f",
+    GarbageState.With_labels: "l",
+    GarbageState.Unknown: "u",
+}
+
+_TYPE_BY_CODE = {code: value for value, code in TYPE_CODES.items()}
+_SUBTYPE_BY_CODE = {code: value for value, code in SUBTYPE_CODES.items()}
+_STATE_BY_CODE = {code: value for value, code in STATE_CODES.items()}
+
+# Запас токенов на обёртку {"items": [...]} и возможные пробелы
+_ENVELOPE_TOKENS = 16
+# Верхняя оценка токенов на один объект с самыми длинными кодами и разделителем.
+# Фактически около 20 для распространённых BPE, не зависит от конкретной модели
+_ITEM_TOKENS = 24
+
+
+def _enum_property(codes: dict) -> dict:
+    return {"type": "string", "enum": list(codes.values())}
+
+
+def compact_response_format() -> dict:
+    """Strict JSON schema GarbageDataList в компактных кодах"""
+    item_schema = {
+        "type": "object",
+        "properties": {
+            "type": _enum_property(TYPE_CODES),
+            "subtype": _enum_property(SUBTYPE_CODES),
+            "state": _enum_property(STATE_CODES),
+        },
+        "required": ["type", "subtype", "state"],
+        "additionalProperties": False,
+    }
+
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "garbage_data_list",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {"items": {"type": "array", "items": item_schema}},
+                "required": ["items"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def compact_codes_prompt() -> str:
+    """Легенда кодов, которая дописывается к системному промпту"""
+
+    def legend(codes: dict) -> str:
+        return ", ".join(f"{value.value}={code}" for value, code in codes.items())
+
+    return (
+        "Вместо полных значений используй только короткие коды.\n"
+        f"type: {legend(TYPE_CODES)}.\n"
+        f"subtype: {legend(SUBTYPE_CODES)}.\n"
+        f"state: {legend(STATE_CODES)}."
+    )
+
+
+def compact_max_tokens(max_items: int) -> int:
+    """Верхняя граница completion токенов для max_items объектов"""
+    return _ENVELOPE_TOKENS + _ITEM_TOKENS * max_items
+
+
+def encode_compact(data: GarbageDataList) -> str:
+    return json.dumps(
+        {
+            "items": [
+                {
+                    "type": TYPE_CODES[item.type],
+                    "subtype": SUBTYPE_CODES[item.subtype],
+                    "state": STATE_CODES[item.state],
+                }
+                for item in data.items
+            ]
+        }
+    )
+
+
+def decode_compact(content: str) -> GarbageDataList:
+    """Разбор ответа в компактных кодах, ValueError при некорректном ответе"""
+    payload = json.loads(content)
+
+    try:
+        items = [
+            GarbageData(
+                type=_TYPE_BY_CODE[item["type"]],
+                subtype=_SUBTYPE_BY_CODE[item["subtype"]],
+                state=_STATE_BY_CODE[item["state"]],
+            )
+            for item in payload["items"]
+        ]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid compact response: {e!r}") from e
+
+    return GarbageDataList(items=items)
+
+
+def decode_full(content: str) -> GarbageDataList:
+    content = content.strip().removeprefix("```json").removesuffix("```")
+    return GarbageDataList.model_validate_json(content)
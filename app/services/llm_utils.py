@@ -1,55 +1,146 @@
 import io
+import math
+import os
+from functools import cache
+from pathlib import Path
+from typing import Literal, Optional
 
-import tiktoken
 from PIL import Image
+from pydantic import BaseModel
 
-tokenizer = tiktoken.encoding_for_model("gpt-4o")
+# Локальный кеш BPE файлов, заполняется при сборке образа
+TIKTOKEN_CACHE_DIR = Path(__file__).parents[2] / ".cache" / "tiktoken"
+
+RESAMPLING = {
+    "nearest": Image.Resampling.NEAREST,
+    "bilinear": Image.Resampling.BILINEAR,
+    "bicubic": Image.Resampling.BICUBIC,
+    "lanczos": Image.Resampling.LANCZOS,
+}
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+class ImagePolicy(BaseModel):
+    """Параметры подготовки изображения для LLM"""
+
+    # Максимальная сторона после уменьшения
+    max_size: int = 300
+    # Если задано, max_size подбирается так, чтобы уложиться в число тайлов 512px.
+    # Берётся квадратная раскладка, округлённая вниз: 1-3 тайла дают 512px,
+    # 4-8 - 1024px, 9-15 - 1536px
+    target_tiles: Optional[int] = None
+    resample: Literal["nearest", "bilinear", "bicubic", "lanczos"] = "lanczos"
+    format: Literal["JPEG", "WEBP", "PNG"] = "JPEG"
+    quality: int = 85
+    optimize: bool = True
+    detail: Literal["auto", "low", "high"] = "auto"
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES[self.format]
+
+    def resolve_max_size(self) -> int:
+        if self.detail == "low":
+            # В режиме low модель всё равно видит не больше 512x512
+            return min(self.max_size, 512)
+
+        if self.target_tiles is None:
+            return self.max_size
+
+        # max_size ограничивает длинную сторону при любых пропорциях, поэтому
+        # гарантированно укладывается только квадрат side x side тайлов
+        side = math.isqrt(self.target_tiles)
+        return max(side, 1) * 512
+
+
+IMAGE_POLICIES: dict[str, ImagePolicy] = {
+    # Близко к прежнему поведению: 300px, LANCZOS, оптимизированный JPEG.
+    # Отличия: единое качество 85 (раньше 90 для фото меньше 2000px) и нет
+    # предварительного уменьшения в 0.8/0.5/0.3, маленькие фото не уменьшаются
+    "default": ImagePolicy(),
+    # Минимальная нагрузка на CPU: быстрая интерполяция и без optimize
+    "fast": ImagePolicy(resample="bilinear", optimize=False, quality=80),
+    # Фиксированная стоимость в 85 токенов
+    "low": ImagePolicy(max_size=512, detail="low", resample="bilinear", quality=80),
+    # WebP меньше по размеру при том же качестве
+    "webp": ImagePolicy(format="WEBP", resample="bilinear", quality=80),
+    # Один тайл в режиме high для мелких деталей (наклейки, загрязнения)
+    "high": ImagePolicy(target_tiles=1, detail="high", resample="bicubic"),
+}
+
+
+def get_image_policy(name: str) -> ImagePolicy:
+    try:
+        return IMAGE_POLICIES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown image policy '{name}', available: {', '.join(IMAGE_POLICIES)}"
+        )
+
+
+@cache
+def get_tokenizer():
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", str(TIKTOKEN_CACHE_DIR))
+
+    import tiktoken
+
+    return tiktoken.encoding_for_model("gpt-4o")
 
 
 def count_tokens(messages: list[str]):
+    tokenizer = get_tokenizer()
     return sum(len(tokenizer.encode(m)) for m in messages)
 
 
-def optimize_for_openai(image_bytes: bytes, target_max_size: int = 200) -> bytes:
-    # Максимальный размер для детального анализа
-    format = "JPEG"
+def count_image_tokens(width: int, height: int, detail: str = "auto") -> int:
+    """Оценка стоимости изображения в токенах по тарификации тайлами gpt-4o"""
+    if detail == "low":
+        return 85
+
+    # Вписываем в 2048x2048, затем короткую сторону уменьшаем до 768
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return 85 + 170 * tiles
+
+
+def optimize_for_openai(
+    image_bytes: bytes, policy: Optional[ImagePolicy] = None
+) -> tuple[bytes, tuple[int, int]]:
+    policy = policy or IMAGE_POLICIES["default"]
+    max_size = policy.resolve_max_size()
 
     buffer = io.BytesIO(image_bytes)
     with Image.open(buffer) as img:
-        original_width, original_height = img.size
-
-        # Определяем базовые параметры на основе исходного размера
-        if max(original_width, original_height) > 4000:  # 4K+
-            scale_factor = 0.3
-            quality = 85
-        elif max(original_width, original_height) > 2000:  # HD+
-            scale_factor = 0.5
-            quality = 85
-        else:  # Меньше HD
-            scale_factor = 0.8
-            quality = 90
-
-        # Рассчитываем новые размеры
-        new_width = int(original_width * scale_factor)
-        new_height = int(original_height * scale_factor)
-
-        # Ограничиваем максимальный размер
-        if max(new_width, new_height) > target_max_size:
-            if new_width > new_height:
-                scale_factor = target_max_size / original_width
-            else:
-                scale_factor = target_max_size / original_height
-
-            new_width = int(original_width * scale_factor)
-            new_height = int(original_height * scale_factor)
+        # Для JPEG декодируем сразу в уменьшенном масштабе, это в разы дешевле
+        img.draft("RGB", (max_size, max_size))
 
         # Конвертируем в RGB если нужно
-        if img.mode in ("RGBA", "P", "LA"):
+        if img.mode not in ("RGB", "L"):
             img = img.convert("RGB")
 
-        resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        # thumbnail сохраняет пропорции и не увеличивает маленькие изображения
+        img.thumbnail(
+            (max_size, max_size),
+            RESAMPLING[policy.resample],
+            reducing_gap=2.0,
+        )
 
         # Сохраняем в байты
         output_buffer = io.BytesIO()
-        resized_img.save(output_buffer, format=format, quality=quality, optimize=True)
-        return output_buffer.getvalue()
+        img.save(
+            output_buffer,
+            format=policy.format,
+            quality=policy.quality,
+            optimize=policy.optimize,
+        )
+        return output_buffer.getvalue(), img.size
+
+
+if __name__ == "__main__":
+    # Прогрев кеша токенизатора: python -m app.services.llm_utils
+    get_tokenizer()
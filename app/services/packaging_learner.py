@@ -0,0 +1,195 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import JSON, column, func, select, true
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+)
+
+from app.models.packaging_record import PackagingRecord
+from app.models.recognition_event import RecognitionEvent
+from app.schemas.gatbage import GarbageData, GarbageState
+from app.settings import SETTINGS
+
+# Ключ session-level advisory lock: обучение выполняет только воркер, который его держит
+LEARNER_LOCK_KEY = 0x5041434B
+
+
+async def learn_packaging_records(
+    session: AsyncSession,
+    min_count: int,
+    min_share: float,
+    window: timedelta,
+) -> int:
+    """
+    Подсчёт ответов LLM по каждому коду и сохранение кода как PackagingRecord
+    с source="ai", когда ответы сходятся. Учитываются только фото с одним кодом
+    и без подсказок, записи из других источников не перезаписываются.
+
+    Подсчёт целиком в БД: для каждой пары (type, subtype) считается число ответов,
+    где она встречается, и в запись попадают пары, встретившиеся хотя бы
+    в min_count ответах и не реже min_share от всех ответов по коду.
+    """
+    events = (
+        select(
+            RecognitionEvent.id,
+            RecognitionEvent.codes[0].as_string().label("code"),
+            RecognitionEvent.items,
+        )
+        .where(
+            RecognitionEvent.mode == "classify",
+            RecognitionEvent.created_at >= datetime.utcnow() - window,
+            func.json_array_length(RecognitionEvent.codes) == 1,
+            func.json_array_length(RecognitionEvent.items) > 0,
+        )
+        .cte("events")
+    )
+    item = (
+        func.json_array_elements(events.c["items"])
+        .table_valued(column("value", JSON))
+        .alias("item")
+    )
+    # Одна пара считается один раз на ответ, даже если объектов с ней несколько
+    pairs = (
+        select(
+            events.c.id,
+            events.c.code,
+            item.c.value["type"].as_string().label("type"),
+            item.c.value["subtype"].as_string().label("subtype"),
+        )
+        .select_from(events)
+        .join(item, true())
+        .distinct()
+        .subquery("pairs")
+    )
+    tally = (
+        select(pairs.c.code, pairs.c.type, pairs.c.subtype, func.count().label("answers"))
+        .group_by(pairs.c.code, pairs.c.type, pairs.c.subtype)
+        .subquery("tally")
+    )
+    totals = (
+        select(events.c.code, func.count().label("answers"))
+        .group_by(events.c.code)
+        .subquery("totals")
+    )
+    stmt = (
+        select(tally.c.code, tally.c.type, tally.c.subtype)
+        .join(totals, totals.c.code == tally.c.code)
+        .where(
+            tally.c.answers >= min_count,
+            tally.c.answers >= min_share * totals.c.answers,
+        )
+        .order_by(tally.c.code, tally.c.type, tally.c.subtype)
+    )
+    result = await session.execute(stmt)
+
+    learned: dict[str, list[tuple[str, str]]] = defaultdict(list)
+    for code, type_, subtype in result.all():
+        learned[code].append((type_, subtype))
+
+    if not learned:
+        return 0
+
+    rows = [
+        {
+            "code": code,
+            "source": "ai",
+            "updated_at": datetime.utcnow(),
+            "items": [
+                GarbageData(
+                    type=type_, subtype=subtype, state=GarbageState.Unknown
+                ).model_dump(mode="json")
+                for type_, subtype in type_pairs
+            ],
+        }
+        for code, type_pairs in learned.items()
+    ]
+
+    stmt = insert(PackagingRecord).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PackagingRecord.code],
+        set_={
+            "items": stmt.excluded["items"],
+            "source": stmt.excluded.source,
+            "updated_at": stmt.excluded.updated_at,
+        },
+        where=PackagingRecord.source == "ai",
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+    return len(rows)
+
+
+async def _acquire_lock(engine: AsyncEngine) -> Optional[AsyncConnection]:
+    """Соединение с захваченным advisory lock или None, если его держит другой воркер"""
+    connection = await engine.connect()
+    try:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        if await connection.scalar(select(func.pg_try_advisory_lock(LEARNER_LOCK_KEY))):
+            return connection
+    except BaseException:
+        await connection.close()
+        raise
+
+    await connection.close()
+    return None
+
+
+async def _release_lock(connection: AsyncConnection) -> None:
+    # Пул не сбрасывает session-level lock при возврате соединения, снимаем явно
+    try:
+        await connection.execute(select(func.pg_advisory_unlock(LEARNER_LOCK_KEY)))
+    except Exception:
+        # Оборванное соединение уже освободило lock, в пул его не возвращаем
+        await connection.invalidate()
+    finally:
+        await connection.close()
+
+
+async def run_packaging_learner(
+    engine: AsyncEngine,
+    session_maker: async_sessionmaker[AsyncSession],
+) -> None:
+    """
+    Периодический запуск learn_packaging_records, запускается из lifespan каждого
+    воркера. Обучение выполняет только воркер, удерживающий advisory lock на
+    отдельном соединении, остальные раз в интервал пробуют его захватить.
+    """
+    lock: Optional[AsyncConnection] = None
+    try:
+        while True:
+            await asyncio.sleep(SETTINGS.PACKAGING_LEARNING_INTERVAL_S)
+
+            try:
+                lock = lock or await _acquire_lock(engine)
+                if lock is None:
+                    continue
+
+                async with session_maker() as session:
+                    learned = await learn_packaging_records(
+                        session,
+                        min_count=SETTINGS.PACKAGING_LEARNING_MIN_COUNT,
+                        min_share=SETTINGS.PACKAGING_LEARNING_MIN_SHARE,
+                        window=timedelta(days=SETTINGS.PACKAGING_LEARNING_WINDOW_DAYS),
+                    )
+            except Exception as e:
+                logger.error(f"[LEARNER]: {e.__class__.__name__}: {e}")
+                # Соединение с lock могло оборваться, захватываем его заново
+                if lock is not None:
+                    await _release_lock(lock)
+                    lock = None
+                continue
+
+            if learned:
+                logger.info(f"[LEARNER]: upserted {learned} packaging records")
+    finally:
+        if lock is not None:
+            await _release_lock(lock)
@@ -1,8 +1,11 @@
 import os
 import tempfile
+from loguru import logger
 from pyzxing import BarCodeReader
 from pydantic import BaseModel
 
+from .barcode_roi import code_regions_mosaic
+
 
 class QrResult(BaseModel):
     type: str
@@ -43,8 +46,34 @@ def scan_codes(image_path: str) -> list[QrResult]:
     return codes
 
 
-def scan_codes_image_bytes(image_bytes: bytes) -> list[QrResult]:
-    tmp = tempfile.NamedTemporaryFile(suffix=".jpg", delete=False)
+def scan_codes_image_bytes(
+    image_bytes: bytes, prefilter: bool = False
+) -> list[QrResult]:
+    if prefilter:
+        return scan_code_regions(image_bytes)
+
+    return _scan_file_bytes(image_bytes, suffix=".jpg")
+
+
+def scan_code_regions(image_bytes: bytes) -> list[QrResult]:
+    """
+    Декодирование только областей, где префильтр нашёл похожие на коды участки.
+    Если префильтр не смог прочитать изображение, сканируется весь кадр.
+    """
+    try:
+        mosaic = code_regions_mosaic(image_bytes)
+    except Exception as e:
+        logger.warning(f"[BARCODE]: prefilter failed, scanning full frame: {e!r}")
+        return _scan_file_bytes(image_bytes, suffix=".jpg")
+
+    if mosaic is None:
+        return []
+
+    return _scan_file_bytes(mosaic, suffix=".png")
+
+
+def _scan_file_bytes(image_bytes: bytes, suffix: str) -> list[QrResult]:
+    tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
     fname = tmp.name
     tmp.write(image_bytes)
     tmp.close()
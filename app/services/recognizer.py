@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import time
+from typing import Literal, Optional
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.packaging_record import PackagingRecord
+from app.schemas.gatbage import GarbageData, GarbageDataList, GarbageState
+from app.settings import SETTINGS
+from .container import Services, get_services
+from .llm_garbage_classifier import TokenUsage
+from .llm_utils import ImagePolicy
+from .qr_code import scan_codes_image_bytes
+
+RecognizeStrategy = Literal["sequential", "speculative", "budget"]
+
+
+async def find_codes(image_data: bytes) -> list[str]:
+    """Поиск штрихкодов и QR кодов на фото"""
+    qr_codes = await asyncio.to_thread(
+        scan_codes_image_bytes, image_data, prefilter=SETTINGS.BARCODE_PREFILTER
+    )
+    return [code.data for code in qr_codes]
+
+
+async def find_packaging_records(
+    codes: list[str], session: AsyncSession
+) -> list[PackagingRecord]:
+    """Известные записи об упаковке для найденных кодов"""
+    packaging_records: list[PackagingRecord] = []
+    for code in codes:
+        record = await PackagingRecord.get(code=code, session=session)
+        if record and record.items:
+            packaging_records.append(record)
+
+    return packaging_records
+
+
+def _waste(services: Services, task: asyncio.Task, usage: TokenUsage) -> None:
+    """
+    Ненужный спекулятивный запрос не отменяется: провайдер уже тарифицирует его,
+    а после завершения в лог попадает реально потраченное число токенов
+    """
+
+    def report(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception():
+            logger.warning(f"[RECOGNIZE]: speculative call failed: {task.exception()}")
+        logger.info(
+            f"[RECOGNIZE]: speculative_wasted prompt_tokens={usage.prompt_tokens} "
+            f"completion_tokens={usage.completion_tokens}"
+        )
+
+    services.adopt(task)
+    task.add_done_callback(report)
+
+
+def _is_trusted(packaging_records: list[PackagingRecord]) -> bool:
+    trusted_sources = {
+        source.strip() for source in SETTINGS.RECOGNIZE_TRUSTED_SOURCES.split(",")
+    }
+    return all(record.source in trusted_sources for record in packaging_records)
+
+
+def _record_event(
+    services: Services,
+    image_data: bytes,
+    codes: list[str],
+    result: GarbageDataList,
+    mode: str,
+    model: str,
+    latency_ms: float,
+) -> None:
+    if not SETTINGS.RECOGNITION_EVENTS:
+        return
+
+    services.event_writer.add(
+        image_hash=hashlib.sha256(image_data).hexdigest(),
+        codes=codes,
+        items=[item.model_dump(mode="json") for item in result.items],
+        mode=mode,
+        model=model,
+        latency_ms=latency_ms,
+    )
+
+
+async def _refine(
+    services: Services,
+    image_data: bytes,
+    codes: list[str],
+    packaging_items: list[list[GarbageData]],
+    image_policy: Optional[ImagePolicy],
+) -> None:
+    """Уточнение состояния через LLM после ответа по быстрому пути"""
+    garbage_classifier = services.garbage_classifier
+    started = time.perf_counter()
+
+    try:
+        result = await garbage_classifier.classify_with_advice(
+            image_data, packaging_items, image_policy
+        )
+    except Exception as e:
+        logger.error(f"[RECOGNIZE]: refinement failed: {e}")
+        return
+
+    latency_ms = (time.perf_counter() - started) * 1000
+    _record_event(
+        services,
+        image_data,
+        codes,
+        result,
+        "refine",
+        garbage_classifier.openai_gpt_model,
+        latency_ms,
+    )
+
+
+async def recognize_image(
+    image_data: bytes,
+    session: AsyncSession,
+    image_policy: Optional[ImagePolicy] = None,
+    strategy: Optional[RecognizeStrategy] = None,
+) -> GarbageDataList:
+    """
+    Распознавание фото: поиск кодов, записи об упаковке и классификация LLM.
+
+    sequential - классификация только после поиска кодов.
+    speculative - classify стартует сразу, параллельно с поиском кодов,
+        и отбрасывается, если нашлись известные коды.
+    budget - запросы записей об упаковке в БД ограничены
+        RECOGNIZE_LOOKUP_BUDGET_MS, при превышении фото классифицируется
+        без подсказок. Сканирование кодов в бюджет не входит: поток ZXing
+        нельзя прервать, и он продолжил бы работу после таймаута.
+
+    При RECOGNIZE_FAST_PATH и кодах только из RECOGNIZE_TRUSTED_SOURCES
+    LLM не вызывается: возвращаются объекты из записей со state unknown.
+    """
+    strategy = strategy or SETTINGS.RECOGNIZE_STRATEGY
+    # Фоновые задачи получают этот же экземпляр, а не новый после close_services
+    services = get_services()
+    garbage_classifier = services.garbage_classifier
+    started = time.perf_counter()
+
+    speculative: Optional[asyncio.Task] = None
+    speculative_usage = TokenUsage()
+    if strategy == "speculative":
+        speculative = asyncio.create_task(
+            garbage_classifier.classify(image_data, image_policy, speculative_usage)
+        )
+
+    try:
+        codes = await find_codes(image_data)
+        lookup = find_packaging_records(codes, session)
+        if strategy == "budget":
+            try:
+                packaging_records = await asyncio.wait_for(
+                    lookup, SETTINGS.RECOGNIZE_LOOKUP_BUDGET_MS / 1000
+                )
+            except asyncio.TimeoutError:
+                logger.info(
+                    "[RECOGNIZE]: lookup budget exceeded, classifying without advice"
+                )
+                packaging_records = []
+        else:
+            packaging_records = await lookup
+    except BaseException:
+        if speculative:
+            _waste(services, speculative, speculative_usage)
+        raise
+
+    lookup_ms = (time.perf_counter() - started) * 1000
+
+    packaging_items = [record.get_items() for record in packaging_records]
+
+    wasted = False
+    if packaging_records and speculative:
+        wasted = True
+        _waste(services, speculative, speculative_usage)
+
+    if not packaging_records:
+        mode = "classify"
+        if speculative:
+            result = await speculative
+        else:
+            result = await garbage_classifier.classify(image_data, image_policy)
+    elif SETTINGS.RECOGNIZE_FAST_PATH and _is_trusted(packaging_records):
+        mode = "fast_path"
+        # Состояние по коду не определить, даже если запись хранит его (PUT /packagings)
+        items = [
+            item.model_copy(update={"state": GarbageState.Unknown})
+            for group in packaging_items
+            for item in group
+        ]
+        result = GarbageDataList(items=garbage_classifier.merge_garbage_items(items))
+
+        # Результат уточнения сохраняется только как событие refine
+        if SETTINGS.RECOGNIZE_FAST_PATH_REFINE and SETTINGS.RECOGNITION_EVENTS:
+            services.spawn(
+                _refine(services, image_data, codes, packaging_items, image_policy)
+            )
+    else:
+        mode = "advice"
+        result = await garbage_classifier.classify_with_advice(
+            image_data, packaging_items, image_policy
+        )
+
+    total_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"[RECOGNIZE]: strategy={strategy} mode={mode} lookup={lookup_ms:.0f}ms "
+        f"total={total_ms:.0f}ms speculative_wasted={wasted}"
+    )
+
+    model = "" if mode == "fast_path" else garbage_classifier.openai_gpt_model
+    _record_event(services, image_data, codes, result, mode, model, total_ms)
+
+    return result
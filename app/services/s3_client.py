@@ -6,8 +6,6 @@ import logging
 import aioboto3
 from pydantic import SecretStr
 
-from app.settings import SETTINGS
-
 
 def safe_s3_call(func):
     async def empty():
@@ -125,10 +123,3 @@ class AsyncS3Client:
                 return True
         except Exception as e:
             return False
-
-
-s3_client = AsyncS3Client(
-    endpoint_url=SETTINGS.S3_ENDPOINT,
-    aws_access_key_id=SETTINGS.S3_ACCESS_KEY,
-    aws_secret_access_key=SETTINGS.S3_SECRET_KEY,
-)
@@ -0,0 +1,167 @@
+import os
+import resource
+import signal
+import sys
+import time
+from contextlib import suppress
+
+import uvicorn
+from loguru import logger
+
+from app.settings import SETTINGS
+
+# Момент старта текущего процесса (для воркеров - момент fork)
+STARTED_AT = time.perf_counter()
+
+# Воркер, проживший меньше этого времени, считается упавшим при старте
+MIN_WORKER_UPTIME_S = 10
+# Задержка перезапуска после раннего падения удваивается до RESTART_BACKOFF_MAX_S
+RESTART_BACKOFF_S = 0.5
+RESTART_BACKOFF_MAX_S = 30
+# После стольких ранних падений подряд одного воркера сервер останавливается
+MAX_EARLY_EXITS = 5
+
+
+def preload() -> None:
+    """
+    Тяжёлые импорты и данные, которые безопасно разделять между воркерами.
+    Клиенты с сетевыми соединениями (OpenAI/httpx, SQLAlchemy, aioboto3) здесь
+    не создаются: приложение импортируется уже в каждом воркере после fork.
+    """
+    started = time.perf_counter()
+
+    import aioboto3  # noqa: F401
+    import fastapi  # noqa: F401
+    import numpy  # noqa: F401
+    import openai  # noqa: F401
+    import sqlalchemy.ext.asyncio  # noqa: F401
+    from PIL import Image
+
+    from app.services.llm_utils import get_tokenizer
+
+    # Регистрируем все плагины форматов, чтобы воркеры не делали это лениво
+    Image.init()
+    # Кодировка кешируется в модуле, воркеры получат её готовой.
+    # Без локального кеша и сети токенизатор нужен только structured output
+    try:
+        get_tokenizer()
+    except Exception as e:
+        logger.warning(f"[SERVING]: tokenizer is not preloaded: {e}")
+
+    preload_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"[SERVING]: preloaded in {preload_ms:.0f}ms")
+
+
+def report_startup() -> None:
+    ready_ms = (time.perf_counter() - STARTED_AT) * 1000
+    # На Linux ru_maxrss в килобайтах, сюда входят и разделяемые после fork страницы
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    logger.info(
+        f"[SERVING]: worker {os.getpid()} ready in {ready_ms:.0f}ms, "
+        f"max rss {max_rss_mb:.1f}MB"
+    )
+
+
+def _run_worker(config: uvicorn.Config, sock) -> int:
+    """Код завершения воркера: 0 при штатной остановке"""
+    global STARTED_AT
+    STARTED_AT = time.perf_counter()
+
+    # Обработчики родителя не должны срабатывать в воркере
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    # При ошибке lifespan startup uvicorn завершается без исключения
+    return 0 if server.started else 1
+
+
+def serve(workers: int) -> None:
+    """Pre-fork сервер: общий сокет и прогретый родитель, воркеры через fork"""
+    preload()
+
+    config = uvicorn.Config(
+        app="app.api.server:app",
+        host=SETTINGS.API_HOST,
+        port=SETTINGS.API_PORT,
+        log_level=SETTINGS.LOGGING_LEVEL.lower(),
+    )
+    sock = config.bind_socket()
+
+    children: dict[int, tuple[int, float]] = {}
+    early_exits = [0] * workers
+    stopping = False
+
+    def spawn(index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = _run_worker(config, sock)
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except BaseException:
+                logger.exception(f"[SERVING]: worker {index} crashed")
+            finally:
+                os._exit(code)
+
+        children[pid] = (index, time.monotonic())
+        logger.info(f"[SERVING]: started worker {index} (pid {pid})")
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        # Воркер мог уже завершиться и быть собран os.wait() до children.pop
+        for pid in list(children):
+            with suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for index in range(workers):
+        spawn(index)
+
+    failed = False
+    while children:
+        pid, status = os.wait()
+        if pid not in children:
+            continue
+
+        index, started = children.pop(pid)
+        if stopping:
+            continue
+
+        code = os.waitstatus_to_exitcode(status)
+        if time.monotonic() - started < MIN_WORKER_UPTIME_S:
+            early_exits[index] += 1
+        else:
+            early_exits[index] = 0
+
+        if early_exits[index] >= MAX_EARLY_EXITS:
+            logger.error(
+                f"[SERVING]: worker {index} exited early {MAX_EARLY_EXITS} times "
+                f"in a row (last code {code}), stopping"
+            )
+            failed = True
+            stop(None, None)
+            continue
+
+        delay = 0.0
+        if early_exits[index]:
+            delay = min(
+                RESTART_BACKOFF_S * 2 ** (early_exits[index] - 1),
+                RESTART_BACKOFF_MAX_S,
+            )
+        logger.warning(
+            f"[SERVING]: worker {index} (pid {pid}) exited with code {code}, "
+            f"restarting in {delay:.1f}s"
+        )
+        time.sleep(delay)
+        if not stopping:
+            spawn(index)
+
+    sock.close()
+    if failed:
+        sys.exit(1)
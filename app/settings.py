@@ -1,23 +1,55 @@
+from functools import cache
 from os import environ
-from typing import Optional
+from typing import Literal, Optional
 
 from dotenv import load_dotenv
 from pydantic import BaseModel, SecretStr
 
-load_dotenv(".env")
-
 
 class Settings(BaseModel):
     IS_DEBUG: bool = False
     LOGGING_LEVEL: str = "INFO"
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
+    API_WORKERS: int = 1
 
     HTTP_PROXY_SERVER: Optional[SecretStr] = None
 
     OPENAI_API_BASE: str
     OPENAI_API_KEY: SecretStr
     OPENAI_GPT_MODEL: str
+    OPENAI_STRUCTURED_OUTPUT: bool = False
+    OPENAI_MAX_ITEMS: int = 8
+    LLM_IMAGE_POLICY: str = "default"
+
+    BARCODE_PREFILTER: bool = False
+
+    RECOGNIZE_STRATEGY: Literal["sequential", "speculative", "budget"] = "sequential"
+    RECOGNIZE_LOOKUP_BUDGET_MS: int = 100
+    RECOGNIZE_FAST_PATH: bool = False
+    RECOGNIZE_FAST_PATH_REFINE: bool = False
+    BACKGROUND_MAX_TASKS: int = 8
+    RECOGNIZE_TRUSTED_SOURCES: str = "manual"
+
+    ADMISSION_MAX_IN_FLIGHT: int = 16
+    ADMISSION_MAX_QUEUE: int = 64
+    ADMISSION_INTERACTIVE_TIMEOUT_MS: int = 5000
+    ADMISSION_BULK_TIMEOUT_MS: int = 30000
+    ADMISSION_BULK_API_KEYS: str = ""
+
+    STREAM_DUPLICATE_DISTANCE: int = 4
+    STREAM_MAX_PENDING_FRAMES: int = 2
+
+    RECOGNITION_EVENTS: bool = False
+    RECOGNITION_EVENTS_BATCH_SIZE: int = 100
+    RECOGNITION_EVENTS_FLUSH_INTERVAL_MS: int = 1000
+    RECOGNITION_EVENTS_MAX_BUFFER: int = 10000
+
+    PACKAGING_LEARNING: bool = False
+    PACKAGING_LEARNING_INTERVAL_S: int = 300
+    PACKAGING_LEARNING_MIN_COUNT: int = 5
+    PACKAGING_LEARNING_MIN_SHARE: float = 0.8
+    PACKAGING_LEARNING_WINDOW_DAYS: int = 30
 
     DB_NAME: SecretStr
     DB_HOST: str
@@ -31,4 +63,17 @@ class Settings(BaseModel):
     S3_BUCKET_NAME: Optional[str] = None
 
 
-SETTINGS = Settings(**environ)
+@cache
+def get_settings() -> Settings:
+    load_dotenv(".env")
+    return Settings(**environ)
+
+
+class LazySettings:
+    """Настройки читаются из окружения при первом обращении, а не при импорте"""
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+
+SETTINGS: Settings = LazySettings()  # type: ignore[assignment]
@@ -0,0 +1,67 @@
+"""
+Точность префильтра штрихкодов и выигрыш по времени на размеченной выборке.
+
+    python -m benchmarks.barcode_prefilter SAMPLES_DIR
+
+SAMPLES_DIR должен содержать подкаталоги with_code/ и no_code/ с фотографиями.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from app.services.barcode_roi import code_regions_mosaic
+from app.services.qr_code import scan_codes_image_bytes
+
+
+def main(samples_dir: str):
+    root = Path(samples_dir)
+    samples = [(path, True) for path in sorted((root / "with_code").glob("*"))]
+    samples += [(path, False) for path in sorted((root / "no_code").glob("*"))]
+    if not samples:
+        sys.exit("usage: python -m benchmarks.barcode_prefilter SAMPLES_DIR")
+
+    tp = fp = fn = tn = 0
+    decoded_full = decoded_roi = 0
+    full_time = roi_time = filter_time = 0.0
+
+    for path, has_code in samples:
+        image = path.read_bytes()
+
+        started = time.perf_counter()
+        mosaic = code_regions_mosaic(image)
+        filter_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        full = scan_codes_image_bytes(image)
+        full_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        roi = scan_codes_image_bytes(image, prefilter=True)
+        roi_time += time.perf_counter() - started
+
+        decoded_full += bool(full)
+        decoded_roi += bool(roi)
+
+        if mosaic and has_code:
+            tp += 1
+        elif mosaic:
+            fp += 1
+        elif has_code:
+            fn += 1
+        else:
+            tn += 1
+
+    count = len(samples)
+    print(f"samples: {count} (with code: {tp + fn}, without: {fp + tn})")
+    print(f"prefilter precision: {tp / max(tp + fp, 1):.3f}")
+    print(f"prefilter recall:    {tp / max(tp + fn, 1):.3f}")
+    print(f"decoded images: full frame {decoded_full}, regions {decoded_roi}")
+    print(f"prefilter only:  {filter_time / count * 1000:8.1f} ms/image")
+    print(f"full frame scan: {full_time / count * 1000:8.1f} ms/image")
+    print(f"prefilter scan:  {roi_time / count * 1000:8.1f} ms/image")
+    print(f"time saved:      {(full_time - roi_time) / count * 1000:8.1f} ms/image")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "")
@@ -0,0 +1,52 @@
+"""
+Время подготовки, размер payload и стоимость в токенах для каждой политики
+подготовки изображения.
+
+    python -m benchmarks.image_policy photo1.jpg photo2.jpg ...
+
+Точность классификации здесь не измеряется: для выбранных политик её нужно
+сверить на размеченной выборке через /api/v1/recognize/?image_policy=...
+"""
+
+import base64
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from app.services.llm_utils import (
+    IMAGE_POLICIES,
+    count_image_tokens,
+    optimize_for_openai,
+)
+
+REPEATS = 5
+
+
+def main(paths: list[str]):
+    images = [Path(path).read_bytes() for path in paths]
+    if not images:
+        sys.exit("usage: python -m benchmarks.image_policy IMAGE [IMAGE ...]")
+
+    print(f"{'policy':<10} {'encode ms':>10} {'payload KB':>11} {'tokens':>7}")
+
+    for name, policy in IMAGE_POLICIES.items():
+        timings, sizes, tokens = [], [], []
+
+        for image in images:
+            for _ in range(REPEATS):
+                started = time.perf_counter()
+                data, (width, height) = optimize_for_openai(image, policy)
+                timings.append(time.perf_counter() - started)
+
+            sizes.append(len(base64.b64encode(data)))
+            tokens.append(count_image_tokens(width, height, policy.detail))
+
+        print(
+            f"{name:<10} {statistics.median(timings) * 1000:>10.2f} "
+            f"{statistics.mean(sizes) / 1024:>11.1f} {statistics.mean(tokens):>7.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
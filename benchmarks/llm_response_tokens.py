@@ -0,0 +1,53 @@
+"""
+Сравнение completion токенов ответа в режиме json_object и в structured output
+с короткими кодами.
+
+    python -m benchmarks.llm_response_tokens
+"""
+
+import itertools
+
+from app.schemas.gatbage import (
+    GarbageData,
+    GarbageDataList,
+    GarbageState,
+    GarbageSubtype,
+    GarbageType,
+)
+from app.services.llm_response import (
+    compact_codes_prompt,
+    compact_max_tokens,
+    encode_compact,
+)
+from app.services.llm_utils import count_tokens
+
+
+def sample(n: int) -> GarbageDataList:
+    values = itertools.cycle(
+        itertools.product(GarbageType, GarbageSubtype, GarbageState)
+    )
+    return GarbageDataList(
+        items=[
+            GarbageData(type=t, subtype=s, state=st)
+            for t, s, st in itertools.islice(values, n)
+        ]
+    )
+
+
+def main():
+    legend_tokens = count_tokens([compact_codes_prompt()])
+    print(f"legend prompt overhead: {legend_tokens} input tokens")
+    print(f"{'items':>5} {'full':>6} {'compact':>8} {'saved':>6} {'max_tokens':>10}")
+
+    for n in (1, 2, 4, 8):
+        data = sample(n)
+        full = count_tokens([data.model_dump_json()])
+        compact = count_tokens([encode_compact(data)])
+        print(
+            f"{n:>5} {full:>6} {compact:>8} {full - compact:>6} "
+            f"{compact_max_tokens(n):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
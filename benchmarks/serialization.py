@@ -0,0 +1,91 @@
+"""
+Стоимость сериализации одной записи в GET /api/v1/packagings/: прежний путь
+через модели и валидацию FastAPI против прямой сериализации сырых данных.
+
+    python -m benchmarks.serialization
+"""
+
+import json
+import timeit
+from datetime import datetime
+
+from pydantic import TypeAdapter
+
+from app.api.schemas.packaging import PackagingRecordRead, packaging_rows_adapter
+from app.api.schemas.response import ListResponse, MetaModel
+from app.models.packaging_record import PackagingRecord
+from app.schemas.gatbage import GarbageData, GarbageState, GarbageSubtype, GarbageType
+
+ROWS = 100
+REPEATS = 200
+
+response_adapter = TypeAdapter(ListResponse[PackagingRecordRead])
+
+
+def make_records() -> list[PackagingRecord]:
+    records = []
+    for index in range(ROWS):
+        record = PackagingRecord(
+            code=str(index), source="manual", updated_at=datetime(2025, 1, 1)
+        )
+        record.set_items(
+            [
+                GarbageData(
+                    type=GarbageType.Plastic,
+                    subtype=GarbageSubtype.PET_Bottle,
+                    state=GarbageState.Unknown,
+                ),
+                GarbageData(
+                    type=GarbageType.Plastic,
+                    subtype=GarbageSubtype.PP_Container,
+                    state=GarbageState.Unknown,
+                ),
+            ]
+        )
+        # Как после чтения из БД: items хранятся строками
+        record.items = json.loads(json.dumps(record.items))
+        records.append(record)
+    return records
+
+
+def before(records: list[PackagingRecord]) -> bytes:
+    result = [
+        PackagingRecordRead(
+            code=record.code,
+            source=record.source,
+            updated_at=record.updated_at,
+            items=record.get_items(),
+        )
+        for record in records
+    ]
+    response = ListResponse[PackagingRecordRead](
+        data=result,
+        meta=MetaModel(offset=0, limit=ROWS, returned=len(result), total=ROWS),
+    )
+    # Повторная валидация и сериализация ответа в FastAPI
+    validated = response_adapter.validate_python(response.model_dump())
+    return response_adapter.dump_json(validated)
+
+
+def after(records: list[PackagingRecord]) -> bytes:
+    return packaging_rows_adapter.dump_json(
+        {
+            "data": [record.to_dict() for record in records],
+            "meta": MetaModel.model_construct(
+                offset=0, limit=ROWS, returned=ROWS, total=ROWS
+            ),
+        }
+    )
+
+
+def main():
+    records = make_records()
+    assert json.loads(before(records)) == json.loads(after(records))
+
+    for name, func in (("before", before), ("after", after)):
+        seconds = timeit.timeit(lambda: func(records), number=REPEATS)
+        print(f"{name:<7} {seconds / REPEATS / ROWS * 1e6:8.2f} us/row")
+
+
+if __name__ == "__main__":
+    main()
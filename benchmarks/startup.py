@@ -0,0 +1,66 @@
+"""
+Время импорта приложения и время до первого ответа.
+
+    python -m benchmarks.startup
+"""
+
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+REPEATS = 5
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import app.api.server; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import() -> float:
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET])
+    return float(output)
+
+
+def measure_first_request(timeout: float = 30) -> float:
+    port = free_port()
+    env = {**os.environ, "API_HOST": "127.0.0.1", "API_PORT": str(port)}
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1)
+                return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("server did not answer")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    imports = [measure_import() for _ in range(REPEATS)]
+    first_requests = [measure_first_request() for _ in range(REPEATS)]
+
+    print(f"import app.api.server: {statistics.median(imports) * 1000:8.0f} ms")
+    print(f"time to first request: {statistics.median(first_requests) * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()